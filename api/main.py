@@ -1,22 +1,29 @@
-import os
+import sys
+import time
+import queue
 import logging
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from chat_schema import ChatRequest, ChatResponse, HealthResponse
 from simple_workflow import get_chat_workflow
-from utils.llm import create_fallback_response
-from dotenv import load_dotenv
+from utils.llm import create_fallback_response, process_llm_response
+from config import settings
 
-# Load environment variables
-load_dotenv()
+# Configure logging - handlers only enqueue records, a background thread formats and writes them.
+# The queue handler is attached in startup_event, next to the listener that drains it: under
+# `python -m api.main` this module is imported twice, and only the served copy ever starts up.
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+log_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
 
-# Configure logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+logging.getLogger().setLevel(settings.log_level)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -25,42 +32,66 @@ app = FastAPI(
     description="AI-powered medical assistant for Spinal Muscular Atrophy (SMA) questions",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
-cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:4200").split(",")
-# app.add_middleware(
-#     CORSMiddleware,
-#     allow_origins=["*"],
-#     allow_credentials=True,
-#     allow_methods=["*"],
-#     allow_headers=["*"],
-# )
+cors_origins = list(settings.cors_origins)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=cors_origins,
+    # Browsers reject credentialed requests to a wildcard origin
+    allow_credentials="*" not in cors_origins,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight results for a day
+)
 
 # Get workflow instance
 chat_workflow = get_chat_workflow()
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Route root logging through the queue and start the background log writer"""
+    logging.getLogger().addHandler(queue_handler)
+    log_listener.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the LLM client's connection pool and flush pending logs"""
+    await chat_workflow.gemma_client.aclose()
+    logging.getLogger().removeHandler(queue_handler)
+    log_listener.stop()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to ensure JSON responses"""
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error("Unhandled exception: %s", exc)
     
     fallback_response = create_fallback_response(
         "An unexpected error occurred while processing your request."
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
-        content=fallback_response.dict()
+        content=fallback_response.model_dump(mode="json")
     )
 
 
+@lru_cache(maxsize=1)
+def _health_response(second: int) -> HealthResponse:
+    """Build the health response once per monotonic second"""
+    return HealthResponse(status="ok")
+
+
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    return HealthResponse(status="ok", timestamp=datetime.utcnow())
+    return _health_response(int(time.monotonic()))
 
 
 @app.post("/api/chat", response_model=ChatResponse)
@@ -81,24 +112,73 @@ async def chat_endpoint(request: ChatRequest, http_request: Request):
         server_name = http_request.headers.get("host", "unknown")
         user_agent = http_request.headers.get("user-agent", "unknown")
         
-        logger.info(f"Chat request from client IP: {client_ip}, server: {server_name}, user-agent: {user_agent[:50]}...")
-        logger.info(f"Received chat request: {request.message[:100]}...")
+        logger.info("Chat request from client IP: %s, server: %s, user-agent: %.50s...", client_ip, server_name, user_agent)
+        logger.info("Received chat request: %.100s...", request.message)
         
         # Process the request through the workflow
         response = await chat_workflow.process_chat(request)
         
-        logger.info(f"Generated response with confidence: {response.confidence} for client: {client_ip}")
+        logger.info("Generated response with confidence: %s for client: %s", response.confidence, client_ip)
         return response
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
+        logger.error("Error in chat endpoint: %s", e)
         # Return fallback response instead of raising exception
         return create_fallback_response()
 
 
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message"""
+    payload = f"data: {orjson.dumps(data).decode()}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+
+async def sse_generator(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    Relay LLM output as SSE deltas, then emit the validated ChatResponse
+    
+    Args:
+        request: ChatRequest containing user message
+        
+    Yields:
+        SSE-formatted "delta" events followed by a final "response" event
+        (a cached answer is sent as the "response" event alone)
+    """
+    response = chat_workflow.get_cached_response(request.message)
+    if response is None:
+        chunks = []
+        try:
+            async for delta in chat_workflow.gemma_client.chat_stream(request.message):
+                chunks.append(delta)
+                yield _sse_event({"delta": delta})
+            
+            response = process_llm_response("".join(chunks), request.message)
+            chat_workflow.cache_response(request.message, response)
+        except Exception as e:
+            logger.error("Error in chat stream: %s", e)
+            response = create_fallback_response()
+    
+    yield _sse_event(response.model_dump(mode="json"), event="response")
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat endpoint - tokens are sent as Server-Sent Events as they are generated
+    
+    Args:
+        request: ChatRequest containing user message
+        
+    Returns:
+        text/event-stream of answer deltas, ending with the validated ChatResponse
+    """
+    logger.info("Received streaming chat request: %.100s...", request.message)
+    return StreamingResponse(sse_generator(request), media_type="text/event-stream")
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -107,20 +187,21 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/api/health",
-        "chat": "/api/chat"
+        "chat": "/api/chat",
+        "chat_stream": "/api/chat/stream"
     }
 
 
 if __name__ == "__main__":
     import uvicorn
     
-    host = os.getenv("API_HOST", "0.0.0.0")
-    port = int(os.getenv("API_PORT", "8000"))
-    
     uvicorn.run(
         "api.main:app",
-        host=host,
-        port=port,
-        reload=True,
-        log_level=os.getenv("LOG_LEVEL", "info").lower()
+        host=settings.api_host,
+        port=settings.api_port,
+        reload=settings.api_reload,
+        workers=settings.api_workers,
+        loop="uvloop",
+        http="httptools",
+        log_level=settings.log_level.lower()
     )
@@ -0,0 +1,45 @@
+import os
+from dataclasses import dataclass
+from typing import Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Application configuration, read from the environment once at startup"""
+    google_api_key: str
+    gemma_model: str
+    log_level: str
+    cors_origins: Tuple[str, ...]
+    api_host: str
+    api_port: int
+    api_reload: bool
+    api_workers: int
+    rate_limit_rpm: int
+    llm_deadline: float
+    response_cache_size: int
+    sma_guard: bool
+
+
+def load_settings() -> Settings:
+    """Build Settings from environment variables"""
+    return Settings(
+        google_api_key=os.getenv("GOOGLE_API_KEY", ""),
+        gemma_model=os.getenv("GEMMA_MODEL_NAME", "gemini-pro"),
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        cors_origins=tuple(os.getenv("CORS_ORIGINS", "http://localhost:4200").split(",")),
+        api_host=os.getenv("API_HOST", "0.0.0.0"),
+        api_port=int(os.getenv("API_PORT", "8000")),
+        api_reload=os.getenv("API_RELOAD", "0") == "1",
+        api_workers=int(os.getenv("API_WORKERS", "1")),
+        rate_limit_rpm=int(os.getenv("GEMMA_RATE_LIMIT_RPM", "0")),
+        llm_deadline=float(os.getenv("GEMMA_DEADLINE_SECONDS", "30")),
+        response_cache_size=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+        sma_guard=os.getenv("SMA_GUARD", "1") == "1",
+    )
+
+
+settings = load_settings()
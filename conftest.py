@@ -0,0 +1,6 @@
+import os
+
+
+def pytest_configure(config):
+    """Set test environment variables before any test module imports the app"""
+    os.environ.setdefault("GOOGLE_API_KEY", "test_key")
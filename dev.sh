@@ -8,7 +8,7 @@ case "$1" in
     "start")
         echo "🚀 Starting SMA Assistant API..."
         source venv/bin/activate 2>/dev/null || echo "⚠️  Virtual environment not found, using system Python"
-        python -m api.main
+        API_RELOAD=1 python -m api.main
         ;;
     "test")
         echo "🧪 Running tests..."
@@ -1,29 +1,54 @@
-import os
 import json
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+import time
+from typing import AsyncIterator, Dict, Any, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-import httpx
+from config import Settings, settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class RateLimiter:
+    """Token-bucket limiter for the Gemini per-minute request quota"""
+
+    def __init__(self, requests_per_minute: int):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(requests_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Only guards the bucket state; never held across a sleep
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a request token is available and take it"""
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            # Sleep outside the lock so concurrent callers are not serialized behind us
+            await asyncio.sleep(wait)
+
+
 class GemmaClient:
     """Async client for Google Gemma via LangChain with robust error handling"""
     
-    def __init__(self):
-        self.api_key = os.getenv("GOOGLE_API_KEY")
+    def __init__(self, config: Optional[Settings] = None):
+        config = config or settings
+        self.api_key = config.google_api_key
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required")
         
         # Initialize the LangChain Google GenAI client
         self.llm = ChatGoogleGenerativeAI(
-            model=os.getenv("GEMMA_MODEL_NAME"),  # Using Gemini Pro as it's more accessible than Gemma
+            model=config.gemma_model,  # Using Gemini Pro as it's more accessible than Gemma
             google_api_key=self.api_key,
             temperature=0.1,  # Low temperature for medical accuracy
             max_tokens=1000,
@@ -34,6 +59,15 @@ class GemmaClient:
         # Load system prompt
         self.system_prompt = self._load_system_prompt()
         
+        # Static part of every request; only the user question varies
+        self._prompt_prefix = self.system_prompt + "\n\nUser Question: "
+
+        # Optional client-side limit matching the Gemini per-minute quota (0 disables)
+        self.rate_limiter = RateLimiter(config.rate_limit_rpm) if config.rate_limit_rpm > 0 else None
+        
+        # Overall bound on one Gemini call, including the library's internal retries
+        self.deadline = config.llm_deadline
+        
     def _load_system_prompt(self) -> str:
         """Load system prompt from file"""
         try:
@@ -44,14 +78,45 @@ class GemmaClient:
             return """You are a medical assistant for SMA. Respond only in JSON format: 
             {"answer": "your response", "confidence": 0.95}"""
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((httpx.TimeoutException, Exception))
-    )
+    def _build_messages(self, user_message: str) -> list:
+        """Build the LLM message list for a user question"""
+        # System prompt is sent as part of a single HumanMessage for compatibility
+        # (convert_system_message_to_human=True would do the same for a SystemMessage)
+        return [HumanMessage(content=self._prompt_prefix + user_message)]
+    
+    async def _invoke_llm(self, user_message: str) -> str:
+        """
+        Call Gemini once, bounded by the overall deadline
+        
+        ChatGoogleGenerativeAI (langchain-google-genai 0.0.8) retries every
+        GoogleAPIError inside ainvoke, up to 10 attempts with backoff up to 60s,
+        and has no max_retries setting. Deterministic errors such as
+        PermissionDenied (bad key) are retried too, so without the deadline a
+        single request could be held for minutes.
+        
+        Args:
+            user_message: The user's question about SMA
+            
+        Returns:
+            Raw response text from the LLM
+        """
+        messages = self._build_messages(user_message)
+        
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        
+        # Call the LLM asynchronously
+        try:
+            response = await asyncio.wait_for(self.llm.ainvoke(messages), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No response from Gemini within {self.deadline:g}s") from None
+        
+        # Extract content
+        return response.content if hasattr(response, 'content') else str(response)
+    
     async def chat_async(self, user_message: str) -> Dict[str, Any]:
         """
-        Send a message to Gemma and get response with retry logic
+        Send a message to Gemma and get response
         
         Args:
             user_message: The user's question about SMA
@@ -60,22 +125,11 @@ class GemmaClient:
             Dict containing the AI response
         """
         try:
-            logger.info(f"Sending request to Gemini: {user_message[:100]}...")
-            
-            # Combine system prompt with user message for Google GenAI
-            # Since convert_system_message_to_human=True, system message becomes human message
-            combined_message = f"{self.system_prompt}\n\nUser Question: {user_message}"
-            
-            # Use single HumanMessage for compatibility
-            messages = [HumanMessage(content=combined_message)]
+            logger.info("Sending request to Gemini: %.100s...", user_message)
             
-            # Call the LLM asynchronously
-            response = await self.llm.ainvoke(messages)
+            response_text = await self._invoke_llm(user_message)
             
-            # Extract content
-            response_text = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"Received response from Gemini: {response_text[:100]}...")
+            logger.info("Received response from Gemini: %.100s...", response_text)
             
             return {
                 "response": response_text,
@@ -84,6 +138,7 @@ class GemmaClient:
             }
             
         except Exception as e:
+            # Reached once the library's own retries are exhausted (or for non-API errors)
             error_msg = f"Error calling Gemini: {str(e)}"
             logger.error(error_msg)
             
@@ -93,9 +148,43 @@ class GemmaClient:
                 "error": error_msg
             }
     
-    async def chat_sync(self, user_message: str) -> Dict[str, Any]:
-        """Synchronous wrapper for chat_async"""
-        return await self.chat_async(user_message)
+    async def aclose(self) -> None:
+        """Close the pooled async gRPC channel shared by all Gemini calls"""
+        async_client = getattr(self.llm.client, "_async_client", None)
+        if async_client is not None:
+            await async_client.transport.close()
+    
+    async def chat_stream(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Stream a Gemma response as it is generated
+        
+        Like chat_async, this adds no retry of its own: the only retries are the
+        library's, around the initial request that opens the stream. Once chunks
+        are flowing nothing is retried, since partial output cannot be replayed.
+        The deadline bounds the wait for the first chunk (and so those retries),
+        not the whole stream. Unlike chat_async, errors propagate to the caller.
+        
+        Args:
+            user_message: The user's question about SMA
+            
+        Yields:
+            Text chunks of the AI response
+        """
+        logger.info("Streaming request to Gemini: %.100s...", user_message)
+        
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        
+        stream = self.llm.astream(self._build_messages(user_message))
+        try:
+            chunk = await asyncio.wait_for(anext(stream, None), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No response from Gemini within {self.deadline:g}s") from None
+        
+        while chunk is not None:
+            if chunk.content:
+                yield chunk.content
+            chunk = await anext(stream, None)
 
 
 # Global client instance
@@ -1 +0,0 @@
-# Empty __init__.py to make graph a package
@@ -14,14 +14,11 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
     import uvicorn
-    from dotenv import load_dotenv
+    from config import settings
     
-    # Load environment variables
-    load_dotenv()
-    
-    host = os.getenv("API_HOST", "0.0.0.0")
-    port = int(os.getenv("API_PORT", "8000"))
-    log_level = os.getenv("LOG_LEVEL", "info").lower()
+    host = settings.api_host
+    port = settings.api_port
+    log_level = settings.log_level.lower()
     
     print("🏥 Starting SMA Medical Assistant API...")
     print(f"📍 Server: http://{host}:{port}")
@@ -30,7 +27,7 @@ if __name__ == "__main__":
     print()
     
     # Check for Google API key
-    if not os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY") == "your_google_api_key_here":
+    if not settings.google_api_key or settings.google_api_key == "your_google_api_key_here":
         print("⚠️  WARNING: GOOGLE_API_KEY not set or using placeholder value!")
         print("   Please edit .env file and add your Google API key")
         print("   Get one at: https://makersuite.google.com/app/apikey")
@@ -40,6 +37,9 @@ if __name__ == "__main__":
         "api.main:app",
         host=host,
         port=port,
-        reload=True,
+        reload=settings.api_reload,
+        workers=settings.api_workers,
+        loop="uvloop",
+        http="httptools",
         log_level=log_level
     )
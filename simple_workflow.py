@@ -1,17 +1,81 @@
 import logging
-from typing import Dict, Any
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
 from chat_schema import ChatRequest, ChatResponse
 from gemma_client import get_gemma_client
-from utils.llm import process_llm_response, create_fallback_response
+from utils.llm import process_llm_response, create_fallback_response, is_fallback_response
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class ResponseCache:
+    """
+    LRU cache of validated ChatResponses, keyed by the normalized question
+    
+    No lock: get and put never await, so on the event loop each runs to completion
+    without interleaving with another coroutine.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._exact: "OrderedDict[str, ChatResponse]" = OrderedDict()
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase and collapse whitespace so trivially different questions share a key"""
+        return " ".join(message.lower().split())
+
+    def get(self, key: str) -> Optional[ChatResponse]:
+        """Exact-match lookup"""
+        response = self._exact.get(key)
+        if response is not None:
+            self._exact.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: ChatResponse) -> None:
+        """Store a response, evicting the least recently used entries"""
+        self._exact[key] = response
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+
 class SimpleChatWorkflow:
-    """Simple workflow for processing SMA chat requests without LangGraph complexity"""
+    """Workflow for processing SMA chat requests: call the LLM, then validate its response"""
     
     def __init__(self):
         self.gemma_client = get_gemma_client()
+        # Validated responses for repeated questions, so they skip the LLM call and re-parsing
+        self.cache = ResponseCache(maxsize=settings.response_cache_size)
+    
+    def get_cached_response(self, message: str) -> Optional[ChatResponse]:
+        """
+        Look up a previously validated response for the same question
+        
+        Args:
+            message: The user's question
+            
+        Returns:
+            A copy of the cached ChatResponse with a fresh timestamp, or None on a miss
+        """
+        cached = self.cache.get(ResponseCache.normalize(message))
+        if cached is None:
+            return None
+        logger.info("Response cache hit: %.100s...", message)
+        return cached.model_copy(update={"timestamp": datetime.now(timezone.utc)})
+    
+    def cache_response(self, message: str, response: ChatResponse) -> None:
+        """
+        Remember a processed response, unless it is a fallback
+        
+        Args:
+            message: The user's question
+            response: The response built by process_llm_response
+        """
+        if not is_fallback_response(response):
+            self.cache.put(ResponseCache.normalize(message), response)
     
     async def process_chat(self, request: ChatRequest) -> ChatResponse:
         """
@@ -24,24 +88,29 @@ class SimpleChatWorkflow:
             ChatResponse object
         """
         try:
-            logger.info(f"Processing chat request: {request.message[:50]}...")
+            logger.info("Processing chat request: %.50s...", request.message)
+            
+            cached = self.get_cached_response(request.message)
+            if cached is not None:
+                return cached
             
             # Step 1: Call Gemma LLM
-            result = await self.gemma_client.chat_sync(request.message)
+            result = await self.gemma_client.chat_async(request.message)
             
             # Step 2: Process the response
             if result["success"] and result["response"]:
                 response = process_llm_response(result["response"], request.message)
+                self.cache_response(request.message, response)
             else:
                 error_msg = result.get("error", "Unknown error occurred")
-                logger.error(f"LLM call failed: {error_msg}")
+                logger.error("LLM call failed: %s", error_msg)
                 response = create_fallback_response()
             
-            logger.info(f"Generated response with confidence: {response.confidence}")
+            logger.info("Generated response with confidence: %s", response.confidence)
             return response
         
         except Exception as e:
-            logger.error(f"Error processing chat workflow: {e}")
+            logger.error("Error processing chat workflow: %s", e)
             return create_fallback_response()
 
 
@@ -1,27 +1,36 @@
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock, AsyncMock
 import json
-import os
+import logging
 
-# Set test environment variables
-os.environ["GOOGLE_API_KEY"] = "test_key"
-
-from api.main import app
+from api.main import app, chat_workflow, queue_handler
 from chat_schema import ChatResponse
+from simple_workflow import ResponseCache
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Test client shared by all tests in this module"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def mock_gemma_client(monkeypatch):
+    """Replace the workflow's Gemma client with a mock (and start from an empty cache) for one test"""
+    mock_client = MagicMock()
+    monkeypatch.setattr(chat_workflow, "gemma_client", mock_client)
+    monkeypatch.setattr(chat_workflow, "cache", ResponseCache())
+    return mock_client
 
 
 class TestHealthEndpoint:
     """Test health check endpoint"""
     
-    def setup_method(self):
-        """Setup test client"""
-        self.client = TestClient(app)
-    
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test health check endpoint"""
-        response = self.client.get("/api/health")
+        response = client.get("/api/health")
         assert response.status_code == 200
         
         data = response.json()
@@ -32,25 +41,18 @@ class TestHealthEndpoint:
 class TestChatEndpoint:
     """Test chat endpoint"""
     
-    def setup_method(self):
-        """Setup test client"""
-        self.client = TestClient(app)
-    
-    @patch('simple_workflow.get_gemma_client')
-    def test_chat_success(self, mock_get_client):
+    def test_chat_success(self, client, mock_gemma_client):
         """Test successful chat interaction"""
         # Mock the Gemma client
-        mock_client = MagicMock()
-        mock_client.chat_sync.return_value = {
+        mock_gemma_client.chat_async = AsyncMock(return_value={
             "success": True,
             "response": '{"answer": "SMA is Spinal Muscular Atrophy, a genetic disorder.", "confidence": 0.9}',
             "error": None
-        }
-        mock_get_client.return_value = mock_client
+        })
         
         # Make request
         request_data = {"message": "What is SMA?"}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         
         assert response.status_code == 200
         data = response.json()
@@ -61,21 +63,18 @@ class TestChatEndpoint:
         assert "SMA" in data["answer"]
         assert 0.0 <= data["confidence"] <= 1.0
     
-    @patch('simple_workflow.get_gemma_client')
-    def test_chat_llm_failure(self, mock_get_client):
+    def test_chat_llm_failure(self, client, mock_gemma_client):
         """Test chat with LLM failure"""
         # Mock failed LLM call
-        mock_client = MagicMock()
-        mock_client.chat_sync.return_value = {
+        mock_gemma_client.chat_async = AsyncMock(return_value={
             "success": False,
             "response": None,
             "error": "LLM service unavailable"
-        }
-        mock_get_client.return_value = mock_client
+        })
         
         # Make request
         request_data = {"message": "What is SMA?"}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         
         assert response.status_code == 200
         data = response.json()
@@ -85,35 +84,67 @@ class TestChatEndpoint:
         assert data["confidence"] == 0.0
         assert "trouble processing" in data["answer"]
     
-    def test_chat_invalid_request(self):
+    def test_chat_stream(self, client, mock_gemma_client):
+        """Test streaming chat emits deltas and a final validated response"""
+        async def fake_stream(message):
+            yield '{"answer": "SMA is Spinal Muscular Atrophy, '
+            yield 'a genetic disorder.", "confidence": 0.9}'
+        
+        mock_gemma_client.chat_stream = fake_stream
+        response = client.post("/api/chat/stream", json={"message": "What is SMA?"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        
+        events = [e for e in response.text.split("\n\n") if e]
+        assert len(events) == 3
+        assert json.loads(events[0].removeprefix("data: ")) == {"delta": '{"answer": "SMA is Spinal Muscular Atrophy, '}
+        
+        event_line, data_line = events[-1].split("\n")
+        assert event_line == "event: response"
+        data = json.loads(data_line.removeprefix("data: "))
+        assert data["answer"] == "SMA is Spinal Muscular Atrophy, a genetic disorder."
+        assert data["confidence"] == 0.9
+    
+    def test_chat_stream_cache_hit(self, client, mock_gemma_client):
+        """Test a repeated streaming question is answered from the cache without deltas"""
+        async def fake_stream(message):
+            yield '{"answer": "SMA is a genetic disorder.", "confidence": 0.9}'
+        
+        mock_gemma_client.chat_stream = MagicMock(side_effect=fake_stream)
+        client.post("/api/chat/stream", json={"message": "What is SMA?"})
+        response = client.post("/api/chat/stream", json={"message": "what is SMA?"})
+        
+        events = [e for e in response.text.split("\n\n") if e]
+        assert len(events) == 1
+        assert events[0].startswith("event: response\n")
+        assert mock_gemma_client.chat_stream.call_count == 1
+    
+    def test_chat_invalid_request(self, client):
         """Test chat with invalid request"""
         # Empty message
         request_data = {"message": ""}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         assert response.status_code == 422
         
         # Missing message
         request_data = {}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         assert response.status_code == 422
     
-    def test_chat_message_too_long(self):
+    def test_chat_message_too_long(self, client):
         """Test chat with message too long"""
         request_data = {"message": "x" * 2001}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         assert response.status_code == 422
 
 
 class TestCORSAndGeneral:
     """Test CORS and general functionality"""
     
-    def setup_method(self):
-        """Setup test client"""
-        self.client = TestClient(app)
-    
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint"""
-        response = self.client.get("/")
+        response = client.get("/")
         assert response.status_code == 200
         
         data = response.json()
@@ -121,30 +152,44 @@ class TestCORSAndGeneral:
         assert "version" in data
         assert data["version"] == "1.0.0"
     
-    def test_cors_headers(self):
+    def test_cors_headers(self, client):
         """Test CORS headers"""
-        response = self.client.options("/api/chat")
+        response = client.options(
+            "/api/chat",
+            headers={
+                "Origin": "http://localhost:4200",
+                "Access-Control-Request-Method": "POST",
+            }
+        )
         assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "http://localhost:4200"
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert response.headers["access-control-max-age"] == "86400"
     
-    def test_404_endpoint(self):
+    def test_log_queue_handler_lifecycle(self, mock_gemma_client):
+        """Test the queue handler is only attached while the app is running"""
+        mock_gemma_client.aclose = AsyncMock()
+        root_logger = logging.getLogger()
+        assert queue_handler not in root_logger.handlers
+        
+        with TestClient(app):
+            assert root_logger.handlers.count(queue_handler) == 1
+        
+        assert queue_handler not in root_logger.handlers
+    
+    def test_404_endpoint(self, client):
         """Test 404 endpoint"""
-        response = self.client.get("/nonexistent")
+        response = client.get("/nonexistent")
         assert response.status_code == 404
 
 
 class TestEndToEnd:
     """End-to-end integration tests"""
     
-    def setup_method(self):
-        """Setup test client"""
-        self.client = TestClient(app)
-    
-    @patch('simple_workflow.get_gemma_client')
-    def test_full_chat_flow(self, mock_get_client):
+    def test_full_chat_flow(self, client, mock_gemma_client):
         """Test complete chat flow from request to response"""
         # Mock successful LLM response
-        mock_client = MagicMock()
-        mock_client.chat_sync.return_value = {
+        mock_gemma_client.chat_async = AsyncMock(return_value={
             "success": True,
             "response": '''
             SMA stands for Spinal Muscular Atrophy. Here's the information:
@@ -157,12 +202,11 @@ class TestEndToEnd:
             ```
             ''',
             "error": None
-        }
-        mock_get_client.return_value = mock_client
+        })
         
         # Test the complete flow
         request_data = {"message": "What is SMA and what causes it?"}
-        response = self.client.post("/api/chat", json=request_data)
+        response = client.post("/api/chat", json=request_data)
         
         assert response.status_code == 200
         data = response.json()
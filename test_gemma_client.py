@@ -0,0 +1,119 @@
+import asyncio
+import dataclasses
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from google.api_core import exceptions as google_exceptions
+from config import settings
+from gemma_client import GemmaClient, RateLimiter
+
+
+@pytest.fixture
+def gemma_client():
+    """GemmaClient with the LLM replaced by a mock"""
+    client = GemmaClient(dataclasses.replace(settings, google_api_key="test_key"))
+    client.llm = MagicMock()
+    return client
+
+
+class TestRateLimiter:
+    """Test the token-bucket rate limiter"""
+    
+    @pytest.mark.asyncio
+    async def test_acquire_within_capacity(self):
+        """Test tokens are handed out immediately while available"""
+        limiter = RateLimiter(requests_per_minute=2)
+        await asyncio.wait_for(limiter.acquire(), timeout=0.1)
+        await asyncio.wait_for(limiter.acquire(), timeout=0.1)
+    
+    @pytest.mark.asyncio
+    async def test_waiter_does_not_hold_lock(self):
+        """Test a caller waiting for a refill sleeps without holding the lock"""
+        limiter = RateLimiter(requests_per_minute=1)
+        await limiter.acquire()
+        
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        
+        assert not waiter.done()
+        assert not limiter._lock.locked()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+
+class TestGemmaClient:
+    """Test GemmaClient error handling"""
+    
+    @pytest.mark.asyncio
+    async def test_error_not_retried_again(self, gemma_client):
+        """Test failures surfacing from ainvoke are not retried on top of the library's own retries"""
+        gemma_client.llm.ainvoke = AsyncMock(side_effect=ValueError("bad request"))
+        
+        result = await gemma_client.chat_async("What is SMA?")
+        
+        assert result["success"] is False
+        assert "bad request" in result["error"]
+        assert gemma_client.llm.ainvoke.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_service_unavailable_not_retried_again(self, gemma_client):
+        """Test transient API errors are left to the library's retry instead of multiplying it"""
+        gemma_client.llm.ainvoke = AsyncMock(side_effect=google_exceptions.ServiceUnavailable("overloaded"))
+        
+        result = await gemma_client.chat_async("What is SMA?")
+        
+        assert result["success"] is False
+        assert gemma_client.llm.ainvoke.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_library_retries(self, gemma_client):
+        """Test a call stuck in the library's retry loop fails once the deadline passes"""
+        async def retrying_forever(messages):
+            await asyncio.sleep(60)
+        
+        gemma_client.deadline = 0.01
+        gemma_client.llm.ainvoke = retrying_forever
+        
+        result = await asyncio.wait_for(gemma_client.chat_async("What is SMA?"), timeout=1)
+        
+        assert result["success"] is False
+        assert "within 0.01s" in result["error"]
+    
+    @pytest.mark.asyncio
+    async def test_chat_stream(self, gemma_client):
+        """Test streamed chunks are relayed as they arrive"""
+        async def fake_astream(messages):
+            for text in ('{"answer": "SMA ', 'info", "confidence": 0.9}'):
+                yield MagicMock(content=text)
+        
+        gemma_client.llm.astream = fake_astream
+        
+        chunks = [chunk async for chunk in gemma_client.chat_stream("What is SMA?")]
+        
+        assert chunks == ['{"answer": "SMA ', 'info", "confidence": 0.9}']
+    
+    @pytest.mark.asyncio
+    async def test_chat_stream_deadline(self, gemma_client):
+        """Test a stream that never opens fails once the deadline passes"""
+        async def fake_astream(messages):
+            await asyncio.sleep(60)
+            yield MagicMock(content="never")
+        
+        gemma_client.deadline = 0.01
+        gemma_client.llm.astream = fake_astream
+        
+        with pytest.raises(TimeoutError, match="within 0.01s"):
+            await asyncio.wait_for(gemma_client.chat_stream("What is SMA?").__anext__(), timeout=1)
+    
+    @pytest.mark.asyncio
+    async def test_aclose(self, gemma_client):
+        """Test aclose closes the async transport once it has been created"""
+        gemma_client.llm.client = MagicMock(_async_client=None)
+        await gemma_client.aclose()
+        
+        async_client = MagicMock()
+        async_client.transport.close = AsyncMock()
+        gemma_client.llm.client = MagicMock(_async_client=async_client)
+        await gemma_client.aclose()
+        
+        async_client.transport.close.assert_awaited_once()
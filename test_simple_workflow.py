@@ -0,0 +1,81 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+from chat_schema import ChatRequest, ChatResponse
+from simple_workflow import ResponseCache, SimpleChatWorkflow
+
+
+@pytest.fixture
+def workflow(monkeypatch):
+    """SimpleChatWorkflow with the Gemma client replaced by a mock"""
+    monkeypatch.setattr("simple_workflow.get_gemma_client", MagicMock)
+    return SimpleChatWorkflow()
+
+
+def llm_result(text):
+    """chat_async result for a successful LLM call"""
+    return {"response": text, "success": True, "error": None}
+
+
+class TestResponseCache:
+    """Test the response cache"""
+    
+    def test_normalize(self):
+        """Test key normalization"""
+        assert ResponseCache.normalize("  What   is\tSMA? ") == "what is sma?"
+    
+    def test_exact_hit(self):
+        """Test exact-match lookup"""
+        cache = ResponseCache()
+        response = ChatResponse(answer="SMA info", confidence=0.9)
+        cache.put("what is sma?", response)
+        assert cache.get("what is sma?") is response
+        assert cache.get("what is zolgensma?") is None
+    
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = ResponseCache(maxsize=2)
+        a, b, c = (ChatResponse(answer=f"SMA {n}", confidence=0.9) for n in "abc")
+        cache.put("a", a)
+        cache.put("b", b)
+        cache.get("a")
+        cache.put("c", c)
+        
+        assert cache.get("a") is a
+        assert cache.get("b") is None
+        assert cache.get("c") is c
+
+
+class TestWorkflowCache:
+    """Test that the workflow caches validated responses"""
+    
+    @pytest.mark.asyncio
+    async def test_repeated_question_served_from_cache(self, workflow):
+        """Test a repeated question skips the LLM and gets a fresh timestamp"""
+        workflow.gemma_client.chat_async = AsyncMock(return_value=llm_result('{"answer": "SMA info", "confidence": 0.9}'))
+        
+        first = await workflow.process_chat(ChatRequest(message="What is SMA?"))
+        cached = workflow.cache.get("what is sma?")
+        cached.timestamp -= timedelta(minutes=1)
+        second = await workflow.process_chat(ChatRequest(message="  what is   SMA? "))
+        
+        assert second.answer == first.answer
+        assert second.confidence == first.confidence
+        assert second is not cached
+        assert second.timestamp > cached.timestamp
+        assert workflow.gemma_client.chat_async.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_invalid_response_not_cached(self, workflow):
+        """Test a truncated response is not served again from the cache"""
+        workflow.gemma_client.chat_async = AsyncMock(side_effect=[
+            llm_result('{"answer": "SMA is a genetic dis'),
+            llm_result('{"answer": "SMA info", "confidence": 0.9}'),
+        ])
+        
+        first = await workflow.process_chat(ChatRequest(message="What is SMA?"))
+        second = await workflow.process_chat(ChatRequest(message="What is SMA?"))
+        
+        assert first.confidence == 0.0
+        assert second.answer == "SMA info"
+        assert workflow.gemma_client.chat_async.await_count == 2
@@ -6,7 +6,9 @@ from utils.llm import (
     validate_chat_response,
     create_fallback_response,
     process_llm_response,
-    _is_sma_related_response
+    is_fallback_response,
+    _is_sma_related_response,
+    _SMA_KEYWORDS
 )
 from chat_schema import ChatResponse
 
@@ -21,6 +23,13 @@ class TestJSONExtraction:
         expected = {"answer": "SMA info", "confidence": 0.9}
         assert result == expected
     
+    def test_extract_json_from_untagged_fenced_block(self):
+        """Test extracting JSON from a fenced block without a language tag"""
+        text = 'Here you go:\n```\n{"answer": "SMA info", "confidence": 0.9}\n```'
+        result = extract_json_from_text(text)
+        expected = {"answer": "SMA info", "confidence": 0.9}
+        assert result == expected
+    
     def test_extract_json_from_plain_text(self):
         """Test extracting JSON from plain text"""
         text = '{"answer": "SMA info", "confidence": 0.9}'
@@ -35,6 +44,13 @@ class TestJSONExtraction:
         expected = {"answer": "SMA info", "confidence": 0.9}
         assert result == expected
     
+    def test_extract_json_ignores_inline_backticks(self):
+        """Test inline code spans do not shadow the JSON object"""
+        text = 'Use `1` as the dose: {"answer": "SMA info", "confidence": 0.9}'
+        result = extract_json_from_text(text)
+        expected = {"answer": "SMA info", "confidence": 0.9}
+        assert result == expected
+    
     def test_extract_json_invalid_text(self):
         """Test extracting JSON from invalid text"""
         text = "This is not JSON at all"
@@ -69,6 +85,12 @@ class TestChatResponseValidation:
         data = {"answer": "SMA info"}
         with pytest.raises(ValueError, match="Missing 'confidence' field"):
             validate_chat_response(data)
+    
+    def test_validate_out_of_range_confidence(self):
+        """Test validation with confidence outside [0, 1]"""
+        data = {"answer": "SMA info", "confidence": 1.5}
+        with pytest.raises(ValueError, match="Invalid ChatResponse format"):
+            validate_chat_response(data)
 
 
 class TestFallbackResponse:
@@ -82,12 +104,26 @@ class TestFallbackResponse:
         assert "trouble processing" in response.answer
         assert "SMA" in response.answer
     
+    def test_default_fallback_is_fresh_copy(self):
+        """Test default fallbacks are independent objects"""
+        first = create_fallback_response()
+        second = create_fallback_response()
+        assert first is not second
+        assert first.answer == second.answer
+        assert second.timestamp >= first.timestamp
+    
     def test_create_custom_fallback(self):
         """Test creating custom fallback response"""
         custom_message = "Custom error occurred"
         response = create_fallback_response(custom_message)
         assert custom_message in response.answer
         assert response.confidence == 0.0
+    
+    def test_is_fallback_response(self):
+        """Test fallbacks are told apart from validated LLM answers"""
+        assert is_fallback_response(create_fallback_response())
+        assert is_fallback_response(create_fallback_response("Custom error occurred"))
+        assert not is_fallback_response(ChatResponse(answer="SMA info", confidence=0.9))
 
 
 class TestSMARelatedCheck:
@@ -105,6 +141,11 @@ class TestSMARelatedCheck:
         for text in sma_texts:
             assert _is_sma_related_response(text) is True
     
+    def test_every_keyword_matches(self):
+        """Test each keyword is still detected, in any case"""
+        for keyword in _SMA_KEYWORDS:
+            assert _is_sma_related_response(f"About {keyword.upper()} today") is True
+    
     def test_sma_related_false(self):
         """Test detecting non-SMA content"""
         non_sma_texts = [
@@ -152,3 +193,13 @@ class TestProcessLLMResponse:
         assert isinstance(response, ChatResponse)
         assert "SMA" in response.answer
         assert "only provide information about" in response.answer
+    
+    def test_process_non_sma_response_guard_disabled(self, monkeypatch):
+        """Test the SMA guard can be switched off"""
+        monkeypatch.setattr("utils.llm.ENABLE_SMA_GUARD", False)
+        raw_response = '{"answer": "I like talking about weather", "confidence": 0.9}'
+        
+        response = process_llm_response(raw_response, "Tell me about weather")
+        
+        assert response.answer == "I like talking about weather"
+        assert response.confidence == 0.9
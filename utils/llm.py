@@ -1,11 +1,65 @@
-import json
 import re
 import logging
-from typing import Dict, Any, Optional
+import orjson
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+from pydantic import ValidationError
 from chat_schema import ChatResponse
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Re-check that answers are SMA-related; can be disabled for models that reliably follow the system prompt
+ENABLE_SMA_GUARD = settings.sma_guard
+
+
+@lru_cache(maxsize=1)
+def _fenced_re() -> re.Pattern:
+    """```json ... ``` or ``` ... ``` fenced block, compiled on first use"""
+    return re.compile(r'```(?:json)?\s*\n(?P<fenced>.*?)\n```', re.DOTALL)
+
+
+# Any of these keywords marks an answer as SMA-related
+_SMA_KEYWORDS = (
+    # English keywords
+    'sma', 'spinal muscular atrophy', 'motor neuron', 'smn1', 'smn2',
+    'muscle weakness', 'muscle atrophy', 'spinraza', 'zolgensma',
+    'risdiplam', 'evrysdi', 'motor unit', 'anterior horn',
+    # Arabic keywords
+    'ضمور العضلات الشوكي', 'الضمور العضلي الشوكي', 'العصبون الحركي',
+    'ضعف العضلات', 'ضمور العضلات', 'سبينرازا', 'زولجينسما',
+    'العضلات', 'الأعصاب', 'الحبل الشوكي', 'القرن الأمامي'
+)
+
+
+def _minimal_keywords(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Drop keywords that contain another keyword - any text they match, the shorter one matches too"""
+    folded = [k.casefold() for k in keywords]
+    return tuple(
+        keyword for keyword, k in zip(keywords, folded)
+        if not any(other != k and other in k for other in folded)
+    )
+
+
+# Smallest equivalent keyword set, matched against the lowercased answer
+_SMA_MATCH_KEYWORDS = _minimal_keywords(_SMA_KEYWORDS)
+
+# Appended to every fallback answer
+_FALLBACK_SUFFIX = " Please try rephrasing your question about Spinal Muscular Atrophy (SMA), or contact a healthcare professional for immediate assistance. / أعتذر، أواجه صعوبة في معالجة طلبك الآن. يرجى إعادة صياغة سؤالك حول ضمور العضلات الشوكي (SMA)، أو الاتصال بأخصائي الرعاية الصحية للحصول على المساعدة الفورية."
+
+# Precomputed answers for the common fallback and the off-topic redirect
+_DEFAULT_FALLBACK_ANSWER = "I apologize, but I'm having trouble processing your request right now." + _FALLBACK_SUFFIX
+_NON_SMA_ANSWER = "I can only provide information about Spinal Muscular Atrophy (SMA). Please ask a question related to SMA, its symptoms, treatments, or management. / يمكنني فقط تقديم معلومات حول ضمور العضلات الشوكي (SMA). يرجى طرح سؤال متعلق بـ SMA أو أعراضه أو علاجاته أو إدارته."
+
+# Validated once at import; default fallbacks are shallow copies with a fresh timestamp
+_DEFAULT_FALLBACK = ChatResponse(answer=_DEFAULT_FALLBACK_ANSWER, confidence=0.0)
+
+
+def _looks_like_json(candidate: str) -> bool:
+    """Cheap shape check so candidates that cannot be a JSON object skip the (raising) parse"""
+    return len(candidate) >= 2 and candidate[0] == '{' and candidate[-1] == '}'
+
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
@@ -24,39 +78,41 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     # Clean the text
     text = text.strip()
     
-    # Try to extract JSON from fenced code blocks first
-    json_patterns = [
-        r'```json\s*\n(.*?)\n```',  # ```json ... ```
-        r'```\s*\n(.*?)\n```',     # ``` ... ```
-        r'`([^`]*)`',              # `...`
-    ]
+    # Fast path - the model is instructed to answer with bare JSON
+    if _looks_like_json(text):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
     
-    for pattern in json_patterns:
-        matches = re.findall(pattern, text, re.DOTALL)
-        for match in matches:
+    # Try to extract JSON from fenced code blocks
+    # Skip the regex scan entirely when there is no fence
+    if '```' in text:
+        for match in _fenced_re().finditer(text):
+            candidate = match.group('fenced').strip()
+            if not _looks_like_json(candidate):
+                continue
             try:
-                return json.loads(match.strip())
-            except json.JSONDecodeError:
+                return orjson.loads(candidate)
+            except orjson.JSONDecodeError:
                 continue
     
-    # Try to parse the entire text as JSON
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
     # Try to find JSON-like structure in the text
+    # Only look for the closing brace after the opening one, and not at all if there is none
     json_start = text.find('{')
-    json_end = text.rfind('}')
+    json_end = text.rfind('}', json_start + 1) if json_start != -1 else -1
+    
+    # Braces spanning the whole text were already tried by the fast path - don't copy and reparse
+    spans_whole_text = json_start == 0 and json_end == len(text) - 1
     
-    if json_start != -1 and json_end != -1 and json_end > json_start:
+    if json_end != -1 and not spans_whole_text:
         potential_json = text[json_start:json_end + 1]
         try:
-            return json.loads(potential_json)
-        except json.JSONDecodeError:
+            return orjson.loads(potential_json)
+        except orjson.JSONDecodeError:
             pass
     
-    logger.warning(f"Could not extract valid JSON from text: {text[:200]}...")
+    logger.warning("Could not extract valid JSON from text: %.200s...", text)
     return None
 
 
@@ -74,36 +130,56 @@ def validate_chat_response(data: Dict[str, Any]) -> ChatResponse:
         ValueError: If validation fails
     """
     try:
-        # Ensure required fields exist
-        if 'answer' not in data:
-            raise ValueError("Missing 'answer' field in response")
-        if 'confidence' not in data:
-            raise ValueError("Missing 'confidence' field in response")
-        
-        # Validate and create ChatResponse
         return ChatResponse(**data)
     
+    except ValidationError as e:
+        missing = [err['loc'][0] for err in e.errors() if err['type'] == 'missing']
+        if missing:
+            message = f"Missing '{missing[0]}' field in response"
+        else:
+            message = f"Invalid ChatResponse format: {e}"
+        logger.error("ChatResponse validation failed: %s", message)
+        raise ValueError(message) from e
+    
     except Exception as e:
-        logger.error(f"ChatResponse validation failed: {e}")
-        raise ValueError(f"Invalid ChatResponse format: {e}")
+        logger.error("ChatResponse validation failed: %s", e)
+        raise ValueError(f"Invalid ChatResponse format: {e}") from e
 
 
-def create_fallback_response(error_message: str = "I apologize, but I'm having trouble processing your request right now.") -> ChatResponse:
+def create_fallback_response(error_message: Optional[str] = None) -> ChatResponse:
     """
     Create a fallback response when LLM fails
     
     Args:
-        error_message: Custom error message
+        error_message: Custom error message, defaults to a generic apology
         
     Returns:
         ChatResponse with fallback content
     """
-    return ChatResponse(
-        answer=f"{error_message} Please try rephrasing your question about Spinal Muscular Atrophy (SMA), or contact a healthcare professional for immediate assistance. / أعتذر، أواجه صعوبة في معالجة طلبك الآن. يرجى إعادة صياغة سؤالك حول ضمور العضلات الشوكي (SMA)، أو الاتصال بأخصائي الرعاية الصحية للحصول على المساعدة الفورية.",
-        confidence=0.0
+    if error_message is None:
+        return _DEFAULT_FALLBACK.model_copy(update={"timestamp": datetime.now(timezone.utc)})
+    
+    # Content is built from literals, so validation can be skipped
+    return ChatResponse.model_construct(
+        answer=error_message + _FALLBACK_SUFFIX,
+        confidence=0.0,
+        timestamp=datetime.now(timezone.utc)
     )
 
 
+def is_fallback_response(response: ChatResponse) -> bool:
+    """
+    Check whether a response was produced by create_fallback_response
+    
+    Args:
+        response: Response returned by process_llm_response
+        
+    Returns:
+        True for fallbacks, which must not be cached or reused
+    """
+    return response.answer.endswith(_FALLBACK_SUFFIX)
+
+
 def process_llm_response(raw_response: str, user_message: str) -> ChatResponse:
     """
     Process raw LLM response into validated ChatResponse
@@ -127,20 +203,22 @@ def process_llm_response(raw_response: str, user_message: str) -> ChatResponse:
         chat_response = validate_chat_response(json_data)
         
         # Additional validation - ensure it's SMA-related
-        if not _is_sma_related_response(chat_response.answer):
+        if ENABLE_SMA_GUARD and not _is_sma_related_response(chat_response.answer):
             logger.warning("Response doesn't appear to be SMA-related")
-            return ChatResponse(
-                answer="I can only provide information about Spinal Muscular Atrophy (SMA). Please ask a question related to SMA, its symptoms, treatments, or management. / يمكنني فقط تقديم معلومات حول ضمور العضلات الشوكي (SMA). يرجى طرح سؤال متعلق بـ SMA أو أعراضه أو علاجاته أو إدارته.",
-                confidence=0.9
+            return ChatResponse.model_construct(
+                answer=_NON_SMA_ANSWER,
+                confidence=0.9,
+                timestamp=datetime.now(timezone.utc)
             )
         
         return chat_response
         
     except Exception as e:
-        logger.error(f"Error processing LLM response: {e}")
+        logger.error("Error processing LLM response: %s", e)
         return create_fallback_response()
 
 
+@lru_cache(maxsize=1024)
 def _is_sma_related_response(answer: str) -> bool:
     """
     Check if response appears to be SMA-related
@@ -151,16 +229,11 @@ def _is_sma_related_response(answer: str) -> bool:
     Returns:
         True if appears SMA-related, False otherwise
     """
-    sma_keywords = [
-        # English keywords
-        'sma', 'spinal muscular atrophy', 'motor neuron', 'smn1', 'smn2',
-        'muscle weakness', 'muscle atrophy', 'spinraza', 'zolgensma',
-        'risdiplam', 'evrysdi', 'motor unit', 'anterior horn',
-        # Arabic keywords
-        'ضمور العضلات الشوكي', 'الضمور العضلي الشوكي', 'العصبون الحركي', 
-        'ضعف العضلات', 'ضمور العضلات', 'سبينرازا', 'زولجينسما',
-        'العضلات', 'الأعصاب', 'الحبل الشوكي', 'القرن الأمامي'
-    ]
-    
+    # Most on-topic answers spell out "SMA" - a plain substring test skips the lowercased copy
+    if 'SMA' in answer:
+        return True
     answer_lower = answer.lower()
-    return any(keyword in answer_lower for keyword in sma_keywords)
+    for keyword in _SMA_MATCH_KEYWORDS:
+        if keyword in answer_lower:
+            return True
+    return False